@@ -35,40 +35,65 @@ ACNT_PRDT_CD: '01'
    4. 대부분의 KIS API는 헤더(Header)에 인증 정보를 넣지만, [토큰 발급 API]만 유일하게 본문(Body)에 키 데이터를 전송합니다.
 """
 
-import requests
 import json
+import logging
 import time
 import os
 from config import APP_KEY, APP_SECRET, URL_BASE
+from kis_http import _SESSION, parse, TOKEN_URL
+
+log = logging.getLogger(__name__)
+
+# token.json 읽기/쓰기용 JSON 백엔드: orjson이 있으면 텍스트 디코딩 없이
+# bytes를 바로 처리합니다. 없으면 stdlib json으로 동일하게 동작합니다.
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps  # bytes를 반환합니다.
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj):
+        return json.dumps(obj).encode('utf-8')
 
 TOKEN_FILE = 'token.json'
 
+# 프로세스 내 토큰 캐시: 같은 프로세스에서 여러 API를 연달아 호출할 때
+# 매번 token.json을 다시 읽지 않도록 메모리에 보관합니다.
+_CACHED = {"access_token": None, "expires_at": 0}
+
 def get_access_token():
     """앱키와 앱시크릿을 이용하여 24시간 유효한 접근 토큰을 발급받거나 기존 토큰을 재사용합니다."""
-    
+
+    # Step 0: 메모리에 유효한 토큰이 있으면 디스크를 건드리지 않고 즉시 반환
+    if _CACHED["access_token"] and time.time() < _CACHED["expires_at"] - 60:
+        return _CACHED["access_token"]
+
     # API 키 누락 확인
     if not APP_KEY or not APP_SECRET:
-        print("❌ config.yaml에서 APP_KEY 또는 APP_SECRET을 찾을 수 없습니다.")
+        log.error("❌ config.yaml에서 APP_KEY 또는 APP_SECRET을 찾을 수 없습니다.")
         return None
 
     # Step 1: 디스크에 저장된 기존 토큰 재사용 (API 호출 횟수 절약 및 차단 방지)
     if os.path.exists(TOKEN_FILE):
         try:
-            with open(TOKEN_FILE, 'r', encoding='utf-8') as f:
-                saved_token = json.load(f)
+            with open(TOKEN_FILE, 'rb') as f:
+                saved_token = _loads(f.read())
             
             # 토큰 유효기간 확인 (재발급 기준: 만료 60초 전까지는 기존 토큰 사용)
             expires_at = saved_token.get('expires_at', 0)
             now = time.time()
             
             if now < expires_at - 60:
-                print("✅ 24시간이 지나지 않은 유효한 토큰이 발견되어 이를 재사용합니다.")
-                print(f"만료까지 남은 시간: {int(expires_at - now)}초")
-                return saved_token.get('access_token')
+                log.info("✅ 24시간이 지나지 않은 유효한 토큰이 발견되어 이를 재사용합니다.")
+                log.info("만료까지 남은 시간: %d초", int(expires_at - now))
+                _CACHED["access_token"] = saved_token.get('access_token')
+                _CACHED["expires_at"] = expires_at
+                return _CACHED["access_token"]
             else:
-                print("⚠️ 저장된 토큰의 유효기간이 만료되었습니다. 새 토큰 발급이 필요합니다.")
+                log.warning("⚠️ 저장된 토큰의 유효기간이 만료되었습니다. 새 토큰 발급이 필요합니다.")
         except Exception as e:
-            print(f"⚠️ 토큰 파일을 읽는 중 문제가 발생했습니다: {e}")
+            log.warning("⚠️ 토큰 파일을 읽는 중 문제가 발생했습니다: %s", e)
 
     # Step 2: 새 인증 토큰 발급 요청
     headers = {"content-type": "application/json"}
@@ -78,20 +103,20 @@ def get_access_token():
         "appsecret": APP_SECRET
     }
     
-    print(f"🔑 한국투자증권 서버에 새 토큰을 요청합니다... ({URL_BASE})")
+    log.info("🔑 한국투자증권 서버에 새 토큰을 요청합니다... (%s)", URL_BASE)
     try:
-        res = requests.post(f"{URL_BASE}/oauth2/tokenP", 
-                           headers=headers, 
-                           data=json.dumps(body))
+        res = _SESSION.post(TOKEN_URL,
+                           headers=headers,
+                           json=body)
         
         if res.status_code == 200:
-            data = res.json()
+            data = parse(res)
             access_token = data['access_token']
             expires_in = int(data['expires_in'])
             
-            print("✅ 새 토큰이 성공적으로 발급되었습니다!")
-            print(f"발급된 토큰 (보안상 앞부분만): {access_token[:20]}...")
-            print(f"만료시간: {expires_in}초 (약 {expires_in/3600:.1f}시간)")
+            log.info("✅ 새 토큰이 성공적으로 발급되었습니다!")
+            log.info("발급된 토큰 (보안상 앞부분만): %s...", access_token[:20])
+            log.info("만료시간: %d초 (약 %.1f시간)", expires_in, expires_in / 3600)
             
             # Step 3: 발급받은 토큰을 로컬 파일에 저장
             token_data = {
@@ -99,19 +124,29 @@ def get_access_token():
                 "expires_at": time.time() + expires_in
             }
             
-            with open(TOKEN_FILE, 'w', encoding='utf-8') as f:
-                json.dump(token_data, f)
-            print(f"💾 향후 재활용을 위해 토큰을 저장했습니다: {TOKEN_FILE}")
-            
+            # 임시 파일에 쓴 뒤 os.replace로 원자적(atomic) 교체합니다.
+            # 저장 도중 프로세스가 죽어도 기존 token.json이 깨지지 않으므로
+            # 불필요한 재발급(서버 측 발급 횟수 제한)에 몰리지 않습니다.
+            tmp_file = TOKEN_FILE + '.tmp'
+            with open(tmp_file, 'wb') as f:
+                f.write(_dumps(token_data))
+            os.replace(tmp_file, TOKEN_FILE)
+            log.info("💾 향후 재활용을 위해 토큰을 저장했습니다: %s", TOKEN_FILE)
+
+            # 새로 발급받은 토큰도 메모리 캐시에 반영
+            _CACHED["access_token"] = access_token
+            _CACHED["expires_at"] = token_data["expires_at"]
+
             return access_token
         else:
-            print(f"❌ 토큰 발급에 실패했습니다. (HTTP 상태 코드: {res.status_code})")
-            print(res.text)
+            log.error("❌ 토큰 발급에 실패했습니다. (HTTP 상태 코드: %s)", res.status_code)
+            log.error(res.text)
             return None
     except Exception as e:
-        print(f"❌ API 서버 연결 중 오류가 발생했습니다: {e}")
+        log.error("❌ API 서버 연결 중 오류가 발생했습니다: %s", e)
         return None
 
 if __name__ == "__main__":
     # 스크립트 직접 실행 시 테스트해볼 수 있습니다.
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     token = get_access_token()
@@ -15,10 +15,30 @@ Chapter 2: 해외주식 현재가 체결가 조회
       - ⚠️ (주의) 종목 매수·매도 주문 시에는 형태가 달라집니다 (예: NASD).
 """
 
-import requests
 import json
-from config import APP_KEY, APP_SECRET, URL_BASE
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from chapter1_token import get_access_token
+from kis_http import _SESSION, make_headers, parse, PRICE_URL, PRICE_DETAIL_URL
+
+log = logging.getLogger(__name__)
+
+# price-detail 응답 필드들에 대한 한국어 설명 (강의 및 디버깅용)
+# 호출마다 dict를 새로 만들 필요가 없으므로 모듈 로드 시 한 번만 생성합니다.
+_FIELD_DESC = {
+    "rsym": "실시간조회종목코드", "pvol": "전일거래량", "open": "시가", "high": "고가",
+    "low": "저가", "last": "현재가", "base": "전일종가", "tomv": "시가총액",
+    "pamt": "전일거래대금", "uplp": "상한가", "dnlp": "하한가", "h52p": "52주최고가",
+    "h52d": "52주최고일자", "l52p": "52주최저가", "l52d": "52주최저일자", "perx": "PER",
+    "pbrx": "PBR", "epsx": "EPS", "bpsx": "BPS", "shar": "상장주수",
+    "mcap": "자본금", "curr": "통화", "zdiv": "소수점자리수", "vnit": "매매단위",
+    "t_xprc": "원환산당일가격", "t_xdif": "원환산당일대비", "t_xrat": "원환산당일등락",
+    "p_xprc": "원환산전일가격", "p_xdif": "원환산전일대비", "p_xrat": "원환산전일등락",
+    "t_rate": "당일환율", "p_rate": "전일환율", "t_xsgn": "원환산당일기호",
+    "p_xsng": "원환산전일기호", "e_ordyn": "거래가능여부", "e_hogau": "호가단위",
+    "e_icod": "업종(섹터)", "e_parp": "액면가", "tvol": "거래량", "tamt": "거래대금",
+    "etyp_nm": "ETP 분류명"
+}
 
 def get_stock_price(token, symbol="AAPL", market="NAS"):
     """
@@ -29,15 +49,8 @@ def get_stock_price(token, symbol="AAPL", market="NAS"):
         symbol (str): 조회할 해외주식 티커 (예: AAPL)
         market (str): 거래소 코드 (NAS, NYS, AMX)
     """
-    headers = {
-        "Content-Type": "application/json",
-        "authorization": f"Bearer {token}",
-        "appKey": APP_KEY,
-        "appsecret": APP_SECRET,
-        "tr_id": "HHDFS00000300",  # 현재가 상세조회를 의미하는 TR_ID
-        "custtype": "P"            # 개인 고객 (B: 법인)
-    }
-    
+    headers = make_headers(token, "HHDFS00000300")  # 현재가 조회를 의미하는 TR_ID
+
     # URL 쿼리 파라미터 구성
     params = {
         "AUTH": "",
@@ -47,47 +60,59 @@ def get_stock_price(token, symbol="AAPL", market="NAS"):
     
     try:
         # KIS API 서버로 GET 요청 전송
-        res = requests.get(
-            f"{URL_BASE}/uapi/overseas-price/v1/quotations/price",
+        res = _SESSION.get(
+            PRICE_URL,
             headers=headers,
             params=params
         )
         
         if res.status_code == 200:
-            data = res.json()
+            data = parse(res)
             if data['rt_cd'] == '0':
                 output = data['output']
-                print(f"✅ [{symbol}] 실시간 시세 조회 성공!")
-                print(f"   - 현재가: ${output['last']}")
-                print(f"   - 전일종가: ${output['base']}")
-                print(f"   - 등락률: {output['rate']}%")
-                print(f"   - 오늘 거래량: {output['tvol']} 주")
+                log.info("✅ [%s] 실시간 시세 조회 성공!", symbol)
+                log.info("   - 현재가: $%s", output['last'])
+                log.info("   - 전일종가: $%s", output['base'])
+                log.info("   - 등락률: %s%%", output['rate'])
+                log.info("   - 오늘 거래량: %s 주", output['tvol'])
                 return float(output['last'])
             else:
-                print(f"❌ API 내에서 에러를 반환했습니다. 메시지: {data['msg1']}")
+                log.error("❌ API 내에서 에러를 반환했습니다. 메시지: %s", data['msg1'])
         else:
-            print(f"❌ HTTP 통신 에러 발생. 상태 코드: {res.status_code}")
-            print(res.text)
-            
+            log.error("❌ HTTP 통신 에러 발생. 상태 코드: %s", res.status_code)
+            log.error(res.text)
+
     except Exception as e:
-        print(f"❌ 네트워크 연결 또는 파싱 오류가 발생했습니다: {e}")
-    
+        log.error("❌ 네트워크 연결 또는 파싱 오류가 발생했습니다: %s", e)
+
     return 0.0
 
+def get_prices_bulk(token, symbols, market="NAS"):
+    """
+    여러 종목의 현재가를 '동시에' 조회합니다.
+
+    시세 조회는 각 호출이 서로 독립적인 네트워크 대기(RTT) 작업이므로,
+    스레드 풀로 병렬 전송하면 전체 소요 시간이 '합'이 아니라 '최대값'으로
+    줄어듭니다. (공유 세션의 연결 풀 덕분에 TLS 연결도 재사용됩니다.)
+
+    Args:
+        token (str): 발급받은 접근 토큰
+        symbols (list[str]): 조회할 티커 목록 (예: ["AAPL", "TSLA"])
+        market (str): 거래소 코드 (NAS, NYS, AMX)
+
+    Returns:
+        list[float]: symbols와 같은 순서의 현재가 목록
+    """
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        return list(ex.map(lambda s: get_stock_price(token, s, market), symbols))
+
 def get_stock_price_detail(token, symbol="AAPL", market="NAS"):
     """
     특정 해외주식 종목의 '상세' 체결가 및 부가 정보를 조회합니다.
     비교 시현을 위해 동일한 API에서 추가 필드를 파싱하는 예제입니다.
     """
-    headers = {
-        "Content-Type": "application/json",
-        "authorization": f"Bearer {token}",
-        "appKey": APP_KEY,
-        "appsecret": APP_SECRET,
-        "tr_id": "HHDFS76200200",  # 해외주식 현재가 상세 (상세정보용)
-        "custtype": "P"
-    }
-    
+    headers = make_headers(token, "HHDFS76200200")  # 해외주식 현재가 상세 (상세정보용)
+
     params = {
         "AUTH": "",
         "EXCD": market,
@@ -95,53 +120,38 @@ def get_stock_price_detail(token, symbol="AAPL", market="NAS"):
     }
     
     try:
-        res = requests.get(
-            f"{URL_BASE}/uapi/overseas-price/v1/quotations/price-detail",
+        res = _SESSION.get(
+            PRICE_DETAIL_URL,
             headers=headers,
             params=params
         )
         
         if res.status_code == 200:
-            data = res.json()
+            data = parse(res)
             if data['rt_cd'] == '0':
                 output = data['output']
-                print(f"✅ [{symbol}] 상세 시세 데이터(price-detail) 전체 항목 불러오기 성공!\n")
-                
-                # 수많은 반환 필드들에 대한 한국어 설명 (강의 및 디버깅용)
-                field_desc = {
-                    "rsym": "실시간조회종목코드", "pvol": "전일거래량", "open": "시가", "high": "고가",
-                    "low": "저가", "last": "현재가", "base": "전일종가", "tomv": "시가총액",
-                    "pamt": "전일거래대금", "uplp": "상한가", "dnlp": "하한가", "h52p": "52주최고가",
-                    "h52d": "52주최고일자", "l52p": "52주최저가", "l52d": "52주최저일자", "perx": "PER",
-                    "pbrx": "PBR", "epsx": "EPS", "bpsx": "BPS", "shar": "상장주수",
-                    "mcap": "자본금", "curr": "통화", "zdiv": "소수점자리수", "vnit": "매매단위",
-                    "t_xprc": "원환산당일가격", "t_xdif": "원환산당일대비", "t_xrat": "원환산당일등락",
-                    "p_xprc": "원환산전일가격", "p_xdif": "원환산전일대비", "p_xrat": "원환산전일등락",
-                    "t_rate": "당일환율", "p_rate": "전일환율", "t_xsgn": "원환산당일기호",
-                    "p_xsng": "원환산전일기호", "e_ordyn": "거래가능여부", "e_hogau": "호가단위",
-                    "e_icod": "업종(섹터)", "e_parp": "액면가", "tvol": "거래량", "tamt": "거래대금",
-                    "etyp_nm": "ETP 분류명"
-                }
-                
-                print("   [API 응답 전체 상세 항목]")
-                print("   --------------------------------------------------")
+                log.info("✅ [%s] 상세 시세 데이터(price-detail) 전체 항목 불러오기 성공!\n", symbol)
+
+                log.info("   [API 응답 전체 상세 항목]")
+                log.info("   --------------------------------------------------")
                 for key, value in output.items():
-                    desc = field_desc.get(key, '알수없음')
-                    print(f"   - {key:<10} | {desc:<12} | {value}")
-                print("   --------------------------------------------------")
+                    desc = _FIELD_DESC.get(key, '알수없음')
+                    log.info("   - %-10s | %-12s | %s", key, desc, value)
+                log.info("   --------------------------------------------------")
                 
                 return output
             else:
-                print(f"❌ API 내에서 에러를 반환했습니다. 메시지: {data['msg1']}")
+                log.error("❌ API 내에서 에러를 반환했습니다. 메시지: %s", data['msg1'])
         else:
-            print(f"❌ HTTP 통신 에러 발생. 상태 코드: {res.status_code}")
-            
+            log.error("❌ HTTP 통신 에러 발생. 상태 코드: %s", res.status_code)
+
     except Exception as e:
-        print(f"❌ 네트워크 연결 또는 파싱 오류가 발생했습니다: {e}")
-    
+        log.error("❌ 네트워크 연결 또는 파싱 오류가 발생했습니다: %s", e)
+
     return None
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("📊 해외주식 시세 조회 실습 (Chapter 2)\n")
     
     # 1. API 호출에 필요한 토큰을 먼저 확보합니다.
@@ -149,15 +159,9 @@ if __name__ == "__main__":
     token = get_access_token()
     
     if token:
-        # 단일 종목 테스트 (애플, 테슬라, 코스트코)
-        print("\n[2단계] AAPL(애플) 시세 조회...")
-        get_stock_price(token, "AAPL", "NAS")
-        
-        print("\n[2단계] TSLA(테슬라) 시세 조회...")
-        get_stock_price(token, "TSLA", "NAS")
-
-        print("\n[2단계] COST(코스트코) 시세 조회...")
-        get_stock_price(token, "COST", "NAS")
+        # 복수 종목 동시 조회 (애플, 테슬라, 코스트코)
+        print("\n[2단계] AAPL / TSLA / COST 시세 병렬 조회...")
+        get_prices_bulk(token, ["AAPL", "TSLA", "COST"])
 
         print("\n[3단계] 테슬라(TSLA) '상세' 정보 조회 비교...")
         get_stock_price_detail(token, "TSLA", "NAS")
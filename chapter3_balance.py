@@ -22,33 +22,91 @@ Chapter 3: 보유 주식 잔고 및 계좌 요약 조회
    계좌번호 앞 8자리 (CANO) + 계좌상품코드 뒤 2자리 (ACNT_PRDT_CD)
 """
 
-import requests
 import json
-from config import APP_KEY, APP_SECRET, URL_BASE, CANO, ACNT_PRDT_CD
+import logging
+from collections import defaultdict
+from config import CANO, ACNT_PRDT_CD, IS_PAPER
 from chapter1_token import get_access_token
+from kis_http import _SESSION, make_headers, parse, BALANCE_URL
+
+log = logging.getLogger(__name__)
+
+# ijson이 설치되어 있으면 응답 바디를 스트리밍 파싱합니다. (선택 설치:
+# pip install ijson) 보유 종목이 많은 계좌에서 output1 리스트 전체를
+# 메모리에 올리지 않고 한 건씩 꺼내 쓸 수 있습니다. 없어도 무방합니다.
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# 스트리밍은 requests 전용 기능(stream=True, res.raw)에 의존합니다.
+# 공유 세션이 httpx 백엔드일 때는 (챕터 7의 prepare_request 가드와 같은
+# 방식으로) 기능 유무를 확인해 기존 전체-파싱 경로로 내려갑니다.
+_CAN_STREAM = ijson is not None and hasattr(_SESSION, 'prepare_request')
+
+# 보유 종목 1건 출력 템플릿: 매 종목마다 5번씩 출력하는 대신
+# 한 번에 조립해 단일 호출로 내보냅니다. (종목 수가 많은 계좌에서 유리)
+# format_map + defaultdict 조합이라 응답에 빠진 필드가 있어도 '-'로 대체됩니다.
+_STOCK_FMT = (
+    "📌 {ovrs_item_name} ({ovrs_pdno})\n"
+    "   - 보유수량: {ovrs_cblc_qty} 주 (주문가능: {ord_psbl_qty} 주)\n"
+    "   - 매입평균가: {pchs_avg_pric} $\n"
+    "   - 실시간현재가: {now_pric2} $\n"
+    "   - 손익 통계: {evlu_pfls_rt}% 평단 대비수익률 / {frcr_evlu_pfls_amt} $ (외화평가손익)\n"
+    + "-" * 52
+).format_map
+
+def _iter_parts(res):
+    """
+    잔고 응답에서 (종류, 값) 튜플을 도착 순서대로 내놓는 제너레이터입니다.
+
+    ijson + requests 조합이면 res.raw를 증분 파싱하여 'stock'(output1의
+    한 건), 'output2', 'rt_cd', 'msg1'을 만들어지는 즉시 내놓습니다. 전체
+    dict를 먼저 구성하지 않으므로 종목 수 N에 대해 피크 메모리가 O(1)입니다.
+    스트리밍이 불가능하면(ijson 미설치 또는 httpx 백엔드) 기존처럼 전체
+    파싱 후 같은 순서로 흘려보냅니다.
+    """
+    if not _CAN_STREAM:
+        data = parse(res)
+        yield ('rt_cd', data.get('rt_cd'))
+        yield ('msg1', data.get('msg1'))
+        for stock in data.get('output1', []):
+            yield ('stock', stock)
+        if 'output2' in data:
+            yield ('output2', data['output2'])
+        return
+
+    res.raw.decode_content = True  # gzip 응답도 투명하게 풀어서 읽습니다.
+    builder = None
+    kind = None
+    for prefix, event, value in ijson.parse(res.raw):
+        if builder is not None:
+            builder.event(event, value)
+            if event == 'end_map' and prefix in ('output1.item', 'output2'):
+                yield (kind, builder.value)
+                builder = None
+        elif event == 'start_map' and prefix in ('output1.item', 'output2'):
+            kind = 'stock' if prefix == 'output1.item' else 'output2'
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+        elif prefix in ('rt_cd', 'msg1'):
+            yield (prefix, value)
 
 def get_my_stocks(token):
     """
     내 계좌의 보유 해외 주식 목록 및 계좌 요약 정보를 조회합니다.
     """
     
-    # 💡 도메인을 기준으로 실전 투자와 모의 투자를 구분해 TR_ID를 동적으로 설정합니다.
-    if "openapi.koreainvestment.com" in URL_BASE:
-        tr_id = "TTTS3012R"  # 실전투자
-        print("🔴 실전투자 모드로 잔고 조회를 요청합니다.")
-    else:
+    # 💡 실전/모의 구분은 설정에서 한 번 판정된 IS_PAPER 상수를 따릅니다.
+    if IS_PAPER:
         tr_id = "VTTS3012R"  # 모의투자
-        print("🔵 모의투자 모드로 잔고 조회를 요청합니다.")
-    
-    headers = {
-        "Content-Type": "application/json",
-        "authorization": f"Bearer {token}",
-        "appKey": APP_KEY,
-        "appsecret": APP_SECRET,
-        "tr_id": tr_id,
-        "custtype": "P"
-    }
+        log.info("🔵 모의투자 모드로 잔고 조회를 요청합니다.")
+    else:
+        tr_id = "TTTS3012R"  # 실전투자
+        log.info("🔴 실전투자 모드로 잔고 조회를 요청합니다.")
     
+    headers = make_headers(token, tr_id)
+
     params = {
         "CANO": CANO,
         "ACNT_PRDT_CD": ACNT_PRDT_CD,
@@ -59,61 +117,62 @@ def get_my_stocks(token):
     }
     
     try:
-        res = requests.get(
-            f"{URL_BASE}/uapi/overseas-stock/v1/trading/inquire-balance",
-            headers=headers,
-            params=params
-        )
-        
+        if _CAN_STREAM:
+            # ijson 스트리밍 파싱을 위해 바디를 미리 읽지 않습니다.
+            # (stream= 키워드는 requests 전용이라 가드 안에서만 씁니다.)
+            res = _SESSION.get(BALANCE_URL, headers=headers, params=params, stream=True)
+        else:
+            res = _SESSION.get(BALANCE_URL, headers=headers, params=params)
+
         if res.status_code == 200:
-            data = res.json()
-            
-            if data['rt_cd'] != '0':
-                print(f"❌ API 로직 오류: {data['msg1']}")
+            # 스트리밍이라 rt_cd가 바디 어디에 오든 도착 순서대로 처리합니다.
+            # 에러 응답에는 output1이 없으므로 종목이 먼저 출력될 일은 없습니다.
+            rt_cd = msg1 = output2 = None
+            shown = 0
+
+            for kind, value in _iter_parts(res):
+                if kind == 'stock':
+                    # 청산된(수량 0) 행도 output1에 섞여 내려올 수 있으므로,
+                    # float 변환을 하기 전에 문자열 비교만으로 먼저 걸러냅니다.
+                    if value.get('ovrs_cblc_qty', '0') in ('0', '0.0', ''):
+                        continue
+                    if shown == 0:
+                        log.info("✅ 보유 주식 잔고 조회 통신 성공!\n")
+                        log.info("================= [보유 종목 상세] =================")
+                    log.info("%s", _STOCK_FMT(defaultdict(lambda: '-', value)))
+                    shown += 1
+                elif kind == 'output2':
+                    output2 = value
+                elif kind == 'rt_cd':
+                    rt_cd = value
+                elif kind == 'msg1':
+                    msg1 = value
+
+            if rt_cd is not None and rt_cd != '0':
+                log.error("❌ API 로직 오류: %s", msg1)
                 return
 
-            print("✅ 보유 주식 잔고 조회 통신 성공!\n")
-            
-            # 배열로 내려오는 개별 종목 정보
-            if 'output1' in data and len(data['output1']) > 0:
-                print("================= [보유 종목 상세] =================")
-                for stock in data['output1']:
-                    qty = float(stock.get('ovrs_cblc_qty', 0)) # 보유 수량
-                    if qty > 0:
-                        symbol = stock.get('ovrs_pdno')
-                        name = stock.get('ovrs_item_name')
-                        avg_price = stock.get('pchs_avg_pric')
-                        curr_price = stock.get('now_pric2')
-                        profit_rate = stock.get('evlu_pfls_rt')
-                        profit_amt = stock.get('frcr_evlu_pfls_amt')
-                        
-                        print(f"📌 {name} ({symbol})")
-                        print(f"   - 보유수량: {qty} 주 (주문가능: {stock.get('ord_psbl_qty')} 주)")
-                        print(f"   - 매입평균가: {avg_price} $")
-                        print(f"   - 실시간현재가: {curr_price} $")
-                        print(f"   - 손익 통계: {profit_rate}% 평단 대비수익률 / {profit_amt} $ (외화평가손익)")
-                        print("-" * 52)
-            else:
-                print("ℹ️ 현재 보유중인 해외주식 종목이 없습니다.")
-            
+            if shown == 0:
+                log.info("✅ 보유 주식 잔고 조회 통신 성공!\n")
+                log.info("ℹ️ 현재 보유중인 해외주식 종목이 없습니다.")
+
             # 객체로 내려오는 계좌 총합 요약 정보
-            if 'output2' in data:
-                print("\n================= [계좌 요약 상세] =================")
-                output2 = data['output2']
-                
-                print(f"💵 총 매수금액 (외화): {output2.get('frcr_pchs_amt1')} $")
-                print(f"📈 해외 총 실현손익: {output2.get('ovrs_tot_pfls')} $ ({output2.get('rlzt_erng_rt')}%)")
-                print(f"📊 총 평가손익: {output2.get('tot_evlu_pfls_amt')} $ ({output2.get('tot_pftrt')}%)")
-                print("====================================================")
-        
+            if output2 is not None:
+                log.info("\n================= [계좌 요약 상세] =================")
+                log.info("💵 총 매수금액 (외화): %s $", output2.get('frcr_pchs_amt1'))
+                log.info("📈 해외 총 실현손익: %s $ (%s%%)", output2.get('ovrs_tot_pfls'), output2.get('rlzt_erng_rt'))
+                log.info("📊 총 평가손익: %s $ (%s%%)", output2.get('tot_evlu_pfls_amt'), output2.get('tot_pftrt'))
+                log.info("====================================================")
+
         else:
-            print(f"❌ 네트워크 연결 실패: {res.status_code}")
-            print(res.text)
+            log.error("❌ 네트워크 연결 실패: %s", res.status_code)
+            log.error(res.text)
             
     except Exception as e:
-        print(f"❌ 파싱/실행 중 예외 발생: {e}")
+        log.error("❌ 파싱/실행 중 예외 발생: %s", e)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("💼 계좌 잔고 조회 실습 (Chapter 3)\n")
     token = get_access_token()
     if token:
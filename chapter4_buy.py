@@ -28,11 +28,16 @@ Chapter 4: 해외주식 매수 주문 (지정가 및 LOC 장마감지정가)
    └──────────┴──────────────────┴──────────────────┘
 """
 
-import requests
-import json
 import datetime
-from config import APP_KEY, APP_SECRET, URL_BASE, CANO, ACNT_PRDT_CD
+import functools
+import json
+import logging
+import time
+from config import APP_KEY, APP_SECRET, CANO, ACNT_PRDT_CD
 from chapter1_token import get_access_token
+from kis_http import _SESSION, make_headers, parse, HASHKEY_URL, ORDER_URL, DAYTIME_ORDER_URL
+
+log = logging.getLogger(__name__)
 
 def hashkey(datas):
     """
@@ -44,11 +49,82 @@ def hashkey(datas):
         "appKey": APP_KEY,
         "appsecret": APP_SECRET
     }
-    res = requests.post(f"{URL_BASE}/uapi/hashkey", headers=headers, data=json.dumps(datas))
+    res = _SESSION.post(HASHKEY_URL, headers=headers, json=datas)
     if res.status_code == 200:
-        return res.json()["HASH"]
+        return parse(res)["HASH"]
     else:
-        print("❌ 해시키 발급에 실패했습니다.")
+        log.error("❌ 해시키 발급에 실패했습니다.")
+        return ""
+
+# 주간거래 여부는 1분 안에 바뀔 수 없으므로 60초 동안 판정 결과를 재사용합니다.
+# (주문을 연속으로 쏟아내는 봇에서 호출마다 datetime 객체를 만들 필요가 없습니다.)
+_DAYTIME_CACHE = {"ts": 0.0, "is_daytime": False}
+
+def _is_daytime_cached():
+    """현재 시각이 주간거래(KST 10~18시) 구간인지 60초 캐시를 거쳐 판정합니다."""
+    now = time.time()
+    if now - _DAYTIME_CACHE["ts"] > 60:
+        _DAYTIME_CACHE["ts"] = now
+        _DAYTIME_CACHE["is_daytime"] = 10 <= datetime.datetime.now().hour < 18
+    return _DAYTIME_CACHE["is_daytime"]
+
+@functools.lru_cache(maxsize=256)
+def _hashkey_cached(payload_json):
+    """
+    동일한 주문 본문(payload)에 대한 해시키를 메모리에 캐싱합니다.
+
+    해시키 발급은 그 자체로 KIS 서버 왕복(POST /uapi/hashkey) 한 번이므로,
+    같은 내용의 주문을 반복 전송하는 봇에서는 캐시 적중 시 주문당 RTT가
+    절반으로 줄어듭니다. dict는 해시 불가라 직렬화 문자열을 키로 씁니다.
+    (※ 키 순서를 정렬하지 않고 원본 그대로 직렬화해야 실제 전송 본문과
+    해시 대상 본문이 일치합니다.)
+    (※ 발급 실패는 예외로 던집니다. lru_cache는 예외를 저장하지 않으므로
+    일시적인 실패("")가 캐시에 박제되어 같은 주문이 영영 빈 해시키로
+    나가는 일을 막고, 다음 호출이 발급을 다시 시도하게 됩니다.)
+    """
+    key = hashkey(json.loads(payload_json))
+    if not key:
+        raise RuntimeError("해시키 발급 실패")
+    return key
+
+def hashkey_for(data):
+    """주문 본문 dict에 대한 해시키를 (캐시를 거쳐) 반환합니다. 실패 시 ""."""
+    try:
+        return _hashkey_cached(json.dumps(data))
+    except RuntimeError:
+        return ""
+
+@functools.lru_cache(maxsize=256)
+def _hashkey_bytes_cached(body):
+    """
+    이미 직렬화된 본문 bytes에 대한 해시키를 발급/캐싱합니다.
+
+    같은 bytes가 해시 대상이자 전송 본문이므로 불일치가 원천적으로
+    불가능하고, bytes는 해시 가능하므로 lru_cache를 헬퍼 없이 바로 걸 수
+    있습니다. _hashkey_cached와 같은 이유로 발급 실패는 예외로 던져
+    캐시에 남기지 않습니다.
+    """
+    headers = {
+        "content-type": "application/json",
+        "appKey": APP_KEY,
+        "appsecret": APP_SECRET
+    }
+    res = _SESSION.post(HASHKEY_URL, headers=headers, data=body)
+    if res.status_code == 200:
+        return parse(res)["HASH"]
+    log.error("❌ 해시키 발급에 실패했습니다.")
+    raise RuntimeError("해시키 발급 실패")
+
+def hashkey_bytes(body):
+    """
+    이미 직렬화된 본문 bytes에 대한 해시키를 반환합니다. 실패 시 "".
+
+    본문을 한 번만 직렬화해 해시키 발급과 주문 전송이 같은 bytes를
+    공유하는 호출자(챕터 8)용입니다.
+    """
+    try:
+        return _hashkey_bytes_cached(body)
+    except RuntimeError:
         return ""
 
 def send_buy_order(token, symbol, qty, price, market="NASD", order_type="00"):
@@ -64,29 +140,31 @@ def send_buy_order(token, symbol, qty, price, market="NASD", order_type="00"):
         order_type (str): 주문 유형 ("00": 지정가, "34": LOC 등)
     """
     try:
-        qty_int = int(qty)
-        round_price = round(float(price), 2)
+        # KIS 스펙상 가격은 소수점 둘째 자리 문자열이어야 합니다.
+        # round() 후 f-string을 거치면 "50.0"처럼 자릿수가 깨지므로
+        # format(..., '.2f')로 변환과 정규화를 한 번에 처리합니다.
+        qty_str = str(int(qty))
+        price_str = format(float(price), '.2f')
     except:
-        print("❌ 수량 또는 가격 숫자로 변환하는 데 실패했습니다.")
+        log.error("❌ 수량 또는 가격 숫자로 변환하는 데 실패했습니다.")
         return None
 
-    now = datetime.datetime.now()
-    is_daytime = 10 <= now.hour < 18  # KST 기준 대략적인 주간거래 시간
+    is_daytime = _is_daytime_cached()  # KST 기준 대략적인 주간거래 시간
 
     if is_daytime:
         tr_id = "TTTS6036U"
-        url = f"{URL_BASE}/uapi/overseas-stock/v1/trading/daytime-order"
-        print("☀️ [시간감지] 주간거래(데이타임) 매수 주문으로 진행합니다.")
+        url = DAYTIME_ORDER_URL
+        log.info("☀️ [시간감지] 주간거래(데이타임) 매수 주문으로 진행합니다.")
         
         # ⚠️ 주간거래 시간대에는 LOC 주문이 불가능하므로 강제로 지정가로 변경
         if order_type in ["34", "33", "32", "31"]:
-            print(f"   ⚠️ 주간거래에서는 LOC/MOC가 불가능하여 지정가(LIMIT)로 자동 변경합니다.")
+            log.warning("   ⚠️ 주간거래에서는 LOC/MOC가 불가능하여 지정가(LIMIT)로 자동 변경합니다.")
             order_type = "00"
     else:
         # 야간(정규장) 주문 TR ID (실전투자 기준코드)
         tr_id = "TTTT1002U"
-        url = f"{URL_BASE}/uapi/overseas-stock/v1/trading/order"
-        print("🌙 [시간감지] 정규장/미국야간 매수 주문으로 진행합니다.")
+        url = ORDER_URL
+        log.info("🌙 [시간감지] 정규장/미국야간 매수 주문으로 진행합니다.")
 
     order_type_names = {
         "00": "지정가(LIMIT)",
@@ -96,7 +174,7 @@ def send_buy_order(token, symbol, qty, price, market="NASD", order_type="00"):
         "31": "MOO(장시작시장가)"
     }
     order_type_name = order_type_names.get(order_type, f"알 수 없는 유형({order_type})")
-    print(f"📋 주문 유형: {order_type_name}")
+    log.info("📋 주문 유형: %s", order_type_name)
 
     # 요청 매개변수 조립
     data = {
@@ -105,41 +183,36 @@ def send_buy_order(token, symbol, qty, price, market="NASD", order_type="00"):
         "OVRS_EXCG_CD": market,
         "PDNO": symbol,
         "ORD_DVSN": order_type,
-        "ORD_QTY": str(qty_int),
-        "OVRS_ORD_UNPR": f"{round_price}",
+        "ORD_QTY": qty_str,
+        "OVRS_ORD_UNPR": price_str,
         "ORD_SVR_DVSN_CD": "0"
     }
 
-    headers = {
-        "Content-Type": "application/json",
-        "authorization": f"Bearer {token}",
-        "appKey": APP_KEY,
-        "appsecret": APP_SECRET,
-        "tr_id": tr_id,
-        "custtype": "P"
-    }
+    headers = make_headers(token, tr_id)
 
     # 정규장 실전투자 매수일 경우 해시키 추가 적용
     if tr_id == "TTTT1002U":
-        print("🔑 해시키 암호화 적용 중...")
-        headers["hashkey"] = hashkey(data)
+        log.info("🔑 해시키 암호화 적용 중...")
+        headers["hashkey"] = hashkey_for(data)
 
-    print(f"🚀 실서버 주문 전송: [{symbol}] {qty_int}주 @ ${round_price} ({order_type_name})")
-    res = requests.post(url, headers=headers, data=json.dumps(data), timeout=15)
+    log.info("🚀 실서버 주문 전송: [%s] %s주 @ $%s (%s)", symbol, qty_str, price_str, order_type_name)
+    # json=으로 넘기면 requests가 직렬화와 Content-Length 계산을 한 번에 처리합니다.
+    # (해시키 계산 시에도 같은 직렬화 경로를 타므로 본문과 해시가 어긋나지 않습니다.)
+    res = _SESSION.post(url, headers=headers, json=data, timeout=15)
 
     if res.status_code == 200:
-        output = res.json()
+        output = parse(res)
         if output['rt_cd'] == '0':
             order_no = output['output']['ODNO']
-            print(f"✅ 매수 주문 성공! 🥳 (부여된 주문번호: {order_no})")
+            log.info("✅ 매수 주문 성공! 🥳 (부여된 주문번호: %s)", order_no)
             if order_type == "34":
-                print(f"   ⏰ LOC 주문 특성상 장 마감 시간인 새벽(KST 06:00경) 직후 체결 여부가 확정됩니다.")
+                log.info("   ⏰ LOC 주문 특성상 장 마감 시간인 새벽(KST 06:00경) 직후 체결 여부가 확정됩니다.")
             return order_no
         else:
-            print(f"❌ 매수 요청 실패 (API 서버 응답): {output['msg1']}")
+            log.error("❌ 매수 요청 실패 (API 서버 응답): %s", output['msg1'])
     else:
-        print(f"❌ 매수 요청 실패 (HTTP 에러 통신): {res.status_code}")
-        print(res.text)
+        log.error("❌ 매수 요청 실패 (HTTP 에러 통신): %s", res.status_code)
+        log.error(res.text)
 
     return None
 
@@ -159,6 +232,7 @@ def explain_order_types():
     """)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     explain_order_types()
 
     token = get_access_token()
@@ -18,28 +18,28 @@ Chapter 6: 미체결 주문 조회 (Pending Orders)
    `sll_buy_dvsn_cd` 필드 값이 "02"면 매수, "01"은 매도 주문을 의미합니다.
 """
 
-import requests
-from config import APP_KEY, APP_SECRET, URL_BASE, CANO, ACNT_PRDT_CD
+import logging
+import operator
+from collections import defaultdict
+from config import CANO, ACNT_PRDT_CD, IS_PAPER
 from chapter1_token import get_access_token
+from kis_http import _SESSION, make_headers, parse, NCCS_URL
+
+log = logging.getLogger(__name__)
+
+# 미체결 1건에서 출력에 쓰는 5개 필드를 한 번에 뽑는 추출기.
+# itemgetter는 C 레벨에서 튜플을 바로 만들어 주므로, 건수가 많을 때
+# 행마다 .get()을 5번 호출하는 것보다 빠릅니다.
+_GET = operator.itemgetter('odno', 'pdno', 'sll_buy_dvsn_cd', 'ft_ord_qty', 'ft_ord_unpr3')
 
 def get_pending_orders(token):
     """
     현재 계좌에서 미체결 상태로 남아있는 모든 해외주식 주문을 조회합니다.
     """
-    if "openapi.koreainvestment.com" in URL_BASE:
-        tr_id = "TTTS3018R"
-    else:
-        tr_id = "VTTS3018R"
-    
-    headers = {
-        "Content-Type": "application/json",
-        "authorization": f"Bearer {token}",
-        "appKey": APP_KEY,
-        "appsecret": APP_SECRET,
-        "tr_id": tr_id,
-        "custtype": "P"
-    }
+    tr_id = "VTTS3018R" if IS_PAPER else "TTTS3018R"
     
+    headers = make_headers(token, tr_id)
+
     # 미체결 조회 API의 쿼리 스트링 매개변수
     params = {
         "CANO": CANO,
@@ -51,44 +51,43 @@ def get_pending_orders(token):
     }
     
     try:
-        res = requests.get(
-            f"{URL_BASE}/uapi/overseas-stock/v1/trading/inquire-nccs",
+        res = _SESSION.get(
+            NCCS_URL,
             headers=headers,
             params=params
         )
         
         if res.status_code == 200:
-            data = res.json()
+            data = parse(res)
             
             if data['rt_cd'] == '0':
                 orders = data.get('output', [])
                 
-                print(f"✅ 미체결 대기 주문 건수: 총 {len(orders)}건\n")
+                log.info("✅ 미체결 대기 주문 건수: 총 %d건\n", len(orders))
                 if not orders:
-                    print("👍 다행히 찌꺼기(미체결) 주문이 남아있지 않습니다.")
+                    log.info("👍 다행히 찌꺼기(미체결) 주문이 남아있지 않습니다.")
                     return
 
-                print(f"{'주문번호(ODNO)':<13} | {'티커':<6} | {'구분':<4} | {'수량':>4} | {'주문단가':>8}")
-                print("-" * 55)
+                log.info("%-13s | %-6s | %-4s | %4s | %8s", '주문번호(ODNO)', '티커', '구분', '수량', '주문단가')
+                log.info("-" * 55)
                 
                 for order in orders:
-                    order_no = order.get('odno', '')
-                    symbol = order.get('pdno', '')
-                    side_cd = order.get('sll_buy_dvsn_cd', '')
+                    # 응답에 빠진 필드가 있어도 KeyError 대신 빈 문자열이 나오도록
+                    # defaultdict로 감싸고 한 번에 언패킹합니다.
+                    order_no, symbol, side_cd, qty, price = _GET(defaultdict(str, order))
                     side_str = "매수" if side_cd == '02' else "매도"
-                    qty = order.get('ft_ord_qty', '0')
-                    price = order.get('ft_ord_unpr3', '0')
-                    
-                    print(f"{order_no:<15} | {symbol:<6} | {side_str:<4} | {qty:>4} | $ {price:>6}")
+
+                    log.info("%-15s | %-6s | %-4s | %4s | $ %6s", order_no, symbol, side_str, qty, price)
             else:
-                print(f"❌ KIS API 비즈니스 로직 에러: {data['msg1']}")
+                log.error("❌ KIS API 비즈니스 로직 에러: %s", data['msg1'])
         else:
-            print(f"❌ HTTP 통신 오류: 응답코드 {res.status_code}")
+            log.error("❌ HTTP 통신 오류: 응답코드 %s", res.status_code)
             
     except Exception as e:
-        print(f"❌ 네트워크 또는 파싱 오류 발생: {e}")
+        log.error("❌ 네트워크 또는 파싱 오류 발생: %s", e)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("⏳ 미체결 내역 조회 실습 (Chapter 6)\n")
     token = get_access_token()
     if token:
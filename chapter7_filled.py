@@ -15,39 +15,172 @@ Chapter 7: 해외주식 체결 내역 조회 (Filled Orders)
       다음 페이지를 이어받는 로직의 뼈대를 학습합니다.
 """
 
-import requests
+import io
 import json
 import datetime
+import os
+import pathlib
+import queue
+import random
+import sys
+import threading
 import time
-from config import APP_KEY, APP_SECRET, URL_BASE, CANO, ACNT_PRDT_CD
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import requests
+from config import APP_KEY, APP_SECRET, URL_BASE, CANO, ACNT_PRDT_CD, IS_PAPER
 from chapter1_token import get_access_token
+from kis_http import _SESSION, parse
+from ratelimit import _BUCKET, _AIMD
+
+# 실전/모의 구분은 설정 로드 후 불변이므로 TR_ID를 임포트 시점에 확정합니다.
+TR_ID_FILLED = "VTTS3035R" if IS_PAPER else "TTTS3035R"
+
+# '다음 페이지 있음'을 뜻하는 tr_cont 값: 매 페이지 리스트를 새로 만들며
+# 선형 탐색하는 대신 모듈 상수 frozenset 으로 O(1) 멤버십 검사를 합니다.
+_MORE = frozenset(('M', 'F'))
+
+# 연속조회 커서 저장 파일: 7페이지째에서 프로세스가 죽어도 재실행 시
+# 1페이지부터 다시 받지 않고 마지막 커서에서 이어갑니다. (호출 한도 절약)
+_CURSOR_FILE = pathlib.Path('.kis_cursor.json')
+
+
+def _save_cursor(nk, fk, start_date, end_date):
+    """페이지 1장을 무사히 받을 때마다 커서를 디스크에 남깁니다. (원자적 교체)"""
+    tmp = _CURSOR_FILE.with_suffix('.tmp')
+    tmp.write_text(json.dumps({'nk': nk, 'fk': fk, 'date_range': [start_date, end_date]}))
+    os.replace(tmp, _CURSOR_FILE)
+
+
+def _load_cursor(start_date, end_date):
+    """같은 조회 기간의 저장된 커서가 있으면 (nk, fk)를 돌려줍니다."""
+    try:
+        saved = json.loads(_CURSOR_FILE.read_text())
+    except (OSError, ValueError):
+        return None
+    if saved.get('date_range') == [start_date, end_date] and saved.get('nk'):
+        return saved['nk'], saved.get('fk', '')
+    return None
+
+
+def _clear_cursor():
+    """조회가 끝까지 완료되면 커서 파일을 치웁니다."""
+    try:
+        _CURSOR_FILE.unlink()
+    except OSError:
+        pass
+
+# 429/5xx 재시도 정책: 지수 백오프(0.5 → 1 → 2초)에 지터를 더해
+# 여러 프로세스가 동시에 재시도 폭주를 일으키지 않게 합니다.
+_MAX_RETRIES = 3
+_BACKOFF_BASE = 0.5
+_JITTER = 0.1
+
+
+def _throttle(res, attempt=0):
+    """
+    응답 헤더를 보고 '필요한 만큼만' 대기합니다.
+
+    - 정상(200) 응답: 서버가 Retry-After 로 압박을 알리지 않는 한 쉬지 않습니다.
+      (기존의 무조건 time.sleep(0.1)은 행복 경로에서 페이지당 100ms 낭비였습니다.)
+    - 429/5xx: Retry-After 를 존중하되, 최소한 지수 백오프 + 지터만큼 쉽니다.
+
+    실제 대기한 초를 반환합니다.
+    """
+    try:
+        wait = float(res.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        wait = 0.0
+
+    if res.status_code == 429 or res.status_code >= 500:
+        wait = max(wait, _BACKOFF_BASE * (2 ** attempt) + random.uniform(0, _JITTER))
+
+    if wait > 0:
+        time.sleep(wait)
+    return wait
+
+
+@dataclass(slots=True)
+class FilledOrder:
+    """
+    체결 내역 1건을 담는 구조체입니다.
+
+    응답 dict를 그대로 돌리면 출력 루프가 행마다 .get() 해시 조회와
+    int()/float() 변환을 십여 번씩 반복합니다. 여기서 '한 번만' 변환해
+    담아 두면 이후로는 슬롯 기반 속성 접근만 남고, __dict__ 가 없어
+    행당 메모리도 dict 대비 크게 줄어듭니다.
+    """
+    pdno: str
+    odno: str
+    side: str
+    status: str
+    ord_qty: int
+    ccld_qty: int
+    nccs_qty: int
+    price: float
+    total_amt: float
+    ord_dt: str
+    ord_tmd: str
+    rjct_rson: str
+    rjct_rson_name: str
+
+    @classmethod
+    def from_raw(cls, d):
+        """KIS 응답의 주문 dict 1건을 변환합니다. (숫자 변환은 여기서 한 번만)"""
+        return cls(
+            pdno=d.get('pdno', '???'),
+            odno=d.get('odno', '???'),
+            side=d.get('sll_buy_dvsn_cd_name') or ("매수" if d.get('sll_buy_dvsn_cd') == '02' else "매도"),
+            status=d.get('prcs_stat_name', '???'),
+            ord_qty=int(d.get('ft_ord_qty', 0)),
+            ccld_qty=int(d.get('ft_ccld_qty', 0)),
+            nccs_qty=int(d.get('nccs_qty', 0)),
+            price=float(d.get('ft_ccld_unpr3', '0') or 0),
+            total_amt=float(d.get('ft_ccld_amt3', '0') or 0),
+            ord_dt=d.get('ord_dt', '???'),
+            ord_tmd=d.get('ord_tmd', '???'),
+            rjct_rson=(d.get('rjct_rson') or '').strip(),
+            rjct_rson_name=(d.get('rjct_rson_name') or '').strip(),
+        )
 
 
-def get_filled_orders(token, start_date=None, end_date=None):
+def iter_filled_orders(token, start_date=None, end_date=None, max_pages=None):
     """
-    일자별로 해외주식 주문 체결 내역을 조회합니다.
+    일자별 해외주식 체결 내역을 페이지 단위로 받아 주문 1건씩 yield 합니다.
+
+    리스트에 전부 모은 뒤 반환하는 대신 제너레이터로 흘려보내므로,
+    피크 메모리는 전체 건수가 아니라 '한 페이지 분량'에 그치고,
+    첫 주문은 첫 페이지 파싱 직후 바로 소비자에게 전달됩니다.
+
+    기본은 서버가 tr_cont 로 '더 있음'을 알리는 동안 끝까지 따라갑니다.
+    (예전의 고정 10페이지 제한은 체결이 많은 계좌에서 데이터를 조용히
+    잘라먹는 문제가 있었습니다.) 상한이 필요하면 max_pages 를 지정하세요.
     """
-    if "openapivts" in URL_BASE:
-        tr_id = "VTTS3035R"
+    if IS_PAPER:
         print("🧪 모의투자 서버 기반으로 체결 내역 조회를 시작합니다.")
     else:
-        tr_id = "TTTS3035R"
         print("🚀 실전투자 서버 기반으로 체결 내역 조회를 시작합니다.")
 
-    # 별도의 날짜 입력이 없을 경우 조회 기간을 오늘 하루로 한정합니다.
-    today = datetime.datetime.now().strftime("%Y%m%d")
-    if start_date is None:
-        start_date = today
-    if end_date is None:
-        end_date = today
+    # 별도의 날짜 입력이 없을 경우에만 조회 기간을 오늘 하루로 한정합니다.
+    # (양쪽 날짜가 다 들어오면 strftime 비용을 아예 내지 않습니다.)
+    if start_date is None or end_date is None:
+        today = datetime.datetime.now().strftime("%Y%m%d")
+        if start_date is None:
+            start_date = today
+        if end_date is None:
+            end_date = today
 
     headers = {
         "Content-Type": "application/json",
         "authorization": f"Bearer {token}",
         "appKey": APP_KEY,
         "appsecret": APP_SECRET,
-        "tr_id": tr_id,
-        "custtype": "P"
+        "tr_id": TR_ID_FILLED,
+        "custtype": "P",
+        # 체결 내역은 행이 많을수록 gzip 압축률이 좋습니다 (5~8배).
+        # 압축 해제는 urllib3가 투명하게 처리하고, 서버가 무시하면 그냥 평문입니다.
+        "Accept-Encoding": "gzip, deflate"
     }
 
     params = {
@@ -69,98 +202,229 @@ def get_filled_orders(token, start_date=None, end_date=None):
 
     url = f"{URL_BASE}/uapi/overseas-stock/v1/trading/inquire-ccnl"
 
+    # 같은 기간을 조회하다 중단된 커서가 남아 있으면 거기서부터 이어받습니다.
+    resume = _load_cursor(start_date, end_date)
+    if resume:
+        params["CTX_AREA_NK200"], params["CTX_AREA_FK200"] = resume
+        headers["tr_cont"] = "N"  # 이어받기이므로 연속조회로 표시
+        print("♻️ 이전 실행이 남긴 커서를 발견했습니다. 중단 지점부터 이어서 조회합니다.")
+
+    # 요청 준비(헤더 병합, 쿼리 인코딩)를 페이지마다 반복하지 않도록
+    # PreparedRequest 를 한 번 만들어 두고 send()로 재사용합니다.
+    # 페이지가 넘어갈 때는 연속조회 커서 두 필드만 바뀌므로 URL만 다시 준비합니다.
+    # (httpx 세션에는 prepare_request 가 없으므로 그 경우 기존 get 경로를 탑니다.)
+    prepared = None
+    if hasattr(_SESSION, 'prepare_request'):
+        prepared = _SESSION.prepare_request(
+            requests.Request('GET', url, headers=headers, params=params)
+        )
+
     print(f"\n===== 📅 체결 내역 조회 ({start_date} ~ {end_date}) =====\n")
 
-    all_orders = []
-    max_pages = 10  # 무한루프 방지를 위한 최대 페이지 제한
     current_page = 1
-    
-    while current_page <= max_pages:
-        print(f"🔄 서버에 데이터 요청 중... (페이지 {current_page}/{max_pages})")
-        res = requests.get(url, headers=headers, params=params, timeout=10)
+
+    while True:
+        print(f"🔄 서버에 데이터 요청 중... (페이지 {current_page})")
+        # 공유 세션의 연결 풀을 타므로 페이지마다 TLS 핸드셰이크를 반복하지 않습니다.
+        # 일시적인 혼잡(429/5xx)은 백오프 후 같은 페이지를 재시도합니다.
+        for attempt in range(_MAX_RETRIES):
+            _BUCKET.acquire()  # 프로세스 공유 토큰 버킷으로 계좌 호출 한도를 지킵니다.
+            # AIMD 슬롯: 직렬 조회에선 그냥 통과하지만, 응답 지연/429를 기록해
+            # 병렬 호출자(시세 벌크 조회 등)의 허용 동시성을 조정합니다.
+            with _AIMD.slot():
+                started = time.monotonic()
+                if prepared is not None:
+                    res = _SESSION.send(prepared, timeout=10)
+                else:
+                    res = _SESSION.get(url, headers=headers, params=params, timeout=10)
+            _AIMD.record(time.monotonic() - started, res.status_code)
+            if res.status_code != 429 and res.status_code < 500:
+                break
+            waited = _throttle(res, attempt)
+            print(f"   ⏳ 서버 혼잡 감지 (HTTP {res.status_code}) — {waited:.1f}초 쉬고 재시도 ({attempt + 1}/{_MAX_RETRIES})")
 
         if res.status_code == 200:
-            result = res.json()
+            # orjson이 있으면 bytes에서 바로 파싱합니다. (페이지당 수백 행일 때 체감)
+            result = parse(res)
+
+            if result.get('rt_cd') == '0':
+                # 페이지를 누적하지 않고 받은 즉시 FilledOrder 로 변환해
+                # 소비자에게 흘려보냅니다.
+                for raw in result.get('output', []):
+                    yield FilledOrder.from_raw(raw)
+
 
-            if result.get('rt_cd') == '0':       
-                orders = result.get('output', [])
-                if orders:
-                    all_orders.extend(orders)
-                    
                 # ───────── 🔄 핵심: 연속 조회 (Pagination) 처리 ─────────
                 # 증권사 서버는 한 번에 모든 데이터를 주지 않고 잘라서 전달합니다.
                 # 'tr_cont'가 'M' (More) 이면 다음 데이터가 더 있다는 뜻입니다.
                 
                 tr_cont = res.headers.get('tr_cont', 'D')
-                ctx_nk200 = result.get('ctx_area_nk200', '').strip() 
-                ctx_fk200 = result.get('ctx_area_fk200', '').strip() 
-                
-                if tr_cont in ['M', 'F'] and ctx_nk200:
+                # 커서 필드는 응답에 따라 누락/None 일 수 있으므로 한 번만
+                # 로컬로 정리해 두고 이후로는 재계산하지 않습니다.
+                ctx_nk200 = (result.get('ctx_area_nk200') or '').strip()
+                ctx_fk200 = (result.get('ctx_area_fk200') or '').strip()
+
+                if tr_cont in _MORE and ctx_nk200:
+                    # 이 페이지까지는 무사히 받았으므로 커서를 먼저 기록합니다.
+                    # 이후 어느 지점에서 죽어도 재실행이 여기서 이어갑니다.
+                    _save_cursor(ctx_nk200, ctx_fk200, start_date, end_date)
+
+                    if max_pages is not None and current_page >= max_pages:
+                        print(f"   ⚠️ max_pages={max_pages} 상한에 도달했습니다. 남은 체결 내역은 잘립니다.")
+                        break
                     print("   ➤ 추가 데이터가 존재합니다. 다음 페이지를 불러옵니다.")
                     # 다음 페이지 요청 시 이어받기 위한 키를 파라미터에 삽입
                     params["CTX_AREA_NK200"] = ctx_nk200
                     params["CTX_AREA_FK200"] = ctx_fk200
                     
                     # 매우 중요: 두 번째 페이지부터는 헤더에 'tr_cont': 'N' (Next)를 지정해야 합니다.
-                    headers["tr_cont"] = "N" 
-                    
+                    headers["tr_cont"] = "N"
+
+                    # 준비된 요청에는 바뀐 커서/연속조회 표시만 다시 반영합니다.
+                    if prepared is not None:
+                        prepared.prepare_url(url, params)
+                        prepared.headers["tr_cont"] = "N"
+
+
                     current_page += 1
-                    time.sleep(0.1)  # API 호출 제한 방지 (Rate Limit) 버퍼 대기
+                    _throttle(res)  # 서버가 헤더로 요구할 때만 대기 (기본은 즉시 다음 페이지)
                 else:
+                    _clear_cursor()  # 끝까지 받았으므로 이어받기 파일을 치웁니다.
                     break
             else:
                 print(f"❌ API 내에서 처리 오류 발생: {result.get('msg1', '알 수 없는 에러')}")
+                # 거부된 커서를 파일에 남겨 두면 다음 실행도 같은 죽은 커서를
+                # 이어받아 매번 '체결 내역 없음'으로 잘못 끝나게 됩니다.
+                _clear_cursor()
+                if resume and current_page == 1:
+                    # KIS 연속조회 키는 수명이 짧아, 이어받기 첫 요청의 거부는
+                    # 커서 만료일 가능성이 높습니다. 아직 아무것도 내보내지
+                    # 않았으므로 1페이지부터 새로 조회합니다.
+                    print("♻️ 이어받기 커서가 거부되었습니다. 처음부터 다시 조회합니다.")
+                    resume = None
+                    params["CTX_AREA_NK200"] = ""
+                    params["CTX_AREA_FK200"] = ""
+                    headers.pop("tr_cont", None)
+                    if prepared is not None:
+                        prepared.prepare_url(url, params)
+                        prepared.headers.pop("tr_cont", None)
+                    continue
                 break
         else:
             print(f"❌ HTTP 통신 에러: {res.status_code}")
             print(res.text)
             break
 
-    # ----------- 최종 결과 출력 -----------
-    if not all_orders:
-        print("\n📭 해당 조회 기간 내 체결 내역이 하나도 없습니다.")
-        return
-
-    print(f"\n✅ 조회 로직 완료! (총 {current_page}페이지 탐색 / 📋 합계 {len(all_orders)}건 발견)\n")
-
-    for i, order in enumerate(all_orders, 1):
-        symbol = order.get('pdno', '???')
-        order_no = order.get('odno', '???')
-        side = order.get('sll_buy_dvsn_cd_name') or ("매수" if order.get('sll_buy_dvsn_cd') == '02' else "매도")
-        status = order.get('prcs_stat_name', '???')    # 처리상태명 (완료, 거부, 접수 등)
-        
-        ord_qty = int(order.get('ft_ord_qty', 0))      # 총 주문 수량
-        ccld_qty = int(order.get('ft_ccld_qty', 0))    # 실제 체결된 수량
-        nccs_qty = int(order.get('nccs_qty', 0))       # 잔여 미체결 수량
-        price = order.get('ft_ccld_unpr3', '0')        # 체결된 달러 단가
-        total_amt = order.get('ft_ccld_amt3', '0')     # 체결 총액
-        order_date = order.get('ord_dt', '???')
-        order_time = order.get('ord_tmd', '???')
-
-        print(f"  [{i}] {side} | {symbol} (주문번호: {order_no}) - 처리상태: {status}")
-        
+
+# 수량 상태 출력 템플릿 4종: (미체결 있음)*2 + (체결 있음) 으로 만든
+# 인덱스가 곧바로 템플릿을 고르므로 행마다 if/elif 사다리를 타지 않습니다.
+_QTY_TMPL = (
+    "      수량: 원래 주문 {ord_qty}주 (전량 취소되거나 오류로 거명됨)",      # 미체결 0 · 체결 0
+    "      수량: {ccld_qty}주 완벽하게 전부 체결! (@ ${price})",              # 미체결 0 · 체결 ○
+    "      수량: 주문 {ord_qty}주 (전량 미체결/접수 대기 중)",                # 미체결 ○ · 체결 0
+    "      수량: 주문 {ord_qty}주 중 {ccld_qty}주 부분 체결 (@ ${price}) / 잔여 대기 {nccs_qty}주",  # 둘 다 ○
+)
+
+
+# 출력 버퍼를 비우는 주기 (주문 건수 기준): print() 를 건마다 4~7번
+# 호출하면 그만큼 stdout 락 획득과 write 시스템콜이 발생하므로,
+# StringIO 에 블록을 모아 뒀다가 묶음 단위로 한 번에 내보냅니다.
+_FLUSH_EVERY = 50
+
+
+def print_filled_orders(orders):
+    """
+    iter_filled_orders 가 흘려보내는 주문을 받아 그대로 출력하는 소비자입니다.
+    전체 리스트를 쥐고 있을 필요가 없으므로 건수 카운터만 유지하고,
+    포맷된 텍스트는 버퍼에 모아 묶음당 write 한 번으로 내보냅니다.
+    """
+    total_count = 0
+    buf = io.StringIO()
+
+    for i, order in enumerate(orders, 1):
+        total_count = i
+
+        buf.write(f"  [{i}] {order.side} | {order.pdno} (주문번호: {order.odno}) - 처리상태: {order.status}\n")
+
         # 거부 사유가 있다면 추가 출력 (코드와 사유명 모두 표시)
-        reject_code = order.get('rjct_rson', '').strip()
-        reject_reason = order.get('rjct_rson_name', '').strip()
-        if reject_reason:
-            print(f"      🚨 거부사유: [{reject_code}] {reject_reason}")
-            
-        # 체결 수량과 잔여 미체결 수량에 따른 상태 출력
-        if nccs_qty > 0 and ccld_qty == 0:
-            print(f"      수량: 주문 {ord_qty}주 (전량 미체결/접수 대기 중)")
-        elif nccs_qty > 0 and ccld_qty > 0:
-            print(f"      수량: 주문 {ord_qty}주 중 {ccld_qty}주 부분 체결 (@ ${float(price):,.2f}) / 잔여 대기 {nccs_qty}주")
-            if float(total_amt) > 0:
-                print(f"      총 체결금액: ${float(total_amt):,.2f}")
-        elif nccs_qty == 0 and ccld_qty == 0:
-            print(f"      수량: 원래 주문 {ord_qty}주 (전량 취소되거나 오류로 거명됨)")
-        else:
-            print(f"      수량: {ccld_qty}주 완벽하게 전부 체결! (@ ${float(price):,.2f})")
-            if float(total_amt) > 0:
-                print(f"      총 체결금액: ${float(total_amt):,.2f}")
-                
-        print(f"      처리 일시: {order_date} {order_time}")
-        print()
+        if order.rjct_rson_name:
+            buf.write(f"      🚨 거부사유: [{order.rjct_rson}] {order.rjct_rson_name}\n")
+
+        # 체결 수량과 잔여 미체결 수량에 따른 상태 출력 (분기 없이 인덱싱)
+        status_idx = (order.nccs_qty > 0) * 2 + (order.ccld_qty > 0)
+        buf.write(_QTY_TMPL[status_idx].format_map({
+            "ord_qty": order.ord_qty,
+            "ccld_qty": order.ccld_qty,
+            "nccs_qty": order.nccs_qty,
+            "price": f"{order.price:,.2f}",
+        }) + "\n")
+        if order.ccld_qty > 0 and order.total_amt > 0:
+            buf.write(f"      총 체결금액: ${order.total_amt:,.2f}\n")
+
+        buf.write(f"      처리 일시: {order.ord_dt} {order.ord_tmd}\n\n")
+
+        if i % _FLUSH_EVERY == 0:
+            sys.stdout.write(buf.getvalue())
+            buf = io.StringIO()
+
+    if total_count == 0:
+        buf.write("\n📭 해당 조회 기간 내 체결 내역이 하나도 없습니다.\n")
+    else:
+        buf.write(f"✅ 조회 로직 완료! (📋 합계 {total_count}건 발견)\n")
+    sys.stdout.write(buf.getvalue())
+
+
+# 생산자-소비자 큐 상한: 대략 두 페이지 분량의 주문만 대기시킵니다.
+# (제너레이터가 주문 1건 단위로 흘려보내므로 '페이지 2개' 대신 건수로 제한)
+_QUEUE_MAX = 200
+
+
+def get_filled_orders(token, start_date=None, end_date=None, max_pages=None):
+    """
+    일자별로 해외주식 주문 체결 내역을 조회하여 출력합니다.
+
+    가져오기(생산자 스레드)와 출력(메인 스레드)을 유계 큐로 분리했습니다.
+    페이지 N을 포맷/출력하는 동안 생산자는 이미 페이지 N+1의 네트워크
+    왕복을 진행하므로 둘이 겹치고, 큐 상한 덕에 출력이 느려도 메모리는
+    두 페이지 분량을 넘지 않습니다.
+    """
+    q = queue.Queue(maxsize=_QUEUE_MAX)
+    stop = threading.Event()  # 소비자가 죽었을 때 생산자에게 보내는 중단 신호
+
+    def _put(item):
+        """큐가 가득 차도 stop 신호를 주기적으로 확인하는 put. 중단 시 False."""
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _producer():
+        try:
+            for order in iter_filled_orders(token, start_date, end_date, max_pages):
+                if not _put(order):
+                    return  # 소비자가 사라졌으므로 더 생산할 이유가 없습니다.
+        finally:
+            _put(None)  # 종료 신호 (소비자 루프 탈출용)
+
+    def _consume():
+        while (order := q.get()) is not None:
+            yield order
+
+    # ThreadPoolExecutor 를 쓰면 종료 정리와 생산자 쪽 예외 전파가 깔끔합니다.
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        future = ex.submit(_producer)
+        try:
+            print_filled_orders(_consume())
+        except BaseException:
+            # 출력 쪽 예외(BrokenPipeError 등)로 소비가 멈추면, 가득 찬 큐에
+            # 블로킹 put 중인 생산자가 영원히 깨어나지 못해 with 블록의
+            # join에서 교착됩니다. stop을 올려 생산자를 풀어준 뒤 전파합니다.
+            stop.set()
+            raise
+        future.result()  # 생산자에서 난 예외를 호출자에게 그대로 올립니다.
 
 
 if __name__ == "__main__":
@@ -1,18 +1,42 @@
 import yaml
 import os
 
-def load_config():
+# PyYAML이 libyaml C 확장과 함께 빌드되어 있으면 CSafeLoader(순수 파이썬
+# SafeLoader보다 10배 이상 빠름)를 사용합니다. cron으로 짧은 스크립트를
+# 반복 실행할 때 콜드 스타트에서 차이가 납니다.
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+# 파싱 결과 메모이제이션: (경로, 수정시각 ns) 가 같으면 YAML을 다시 읽지
+# 않습니다. 같은 프로세스에서 설정을 재로드하는 도구(노트북, 테스트 등)가
+# 파일이 안 바뀌었는데도 파싱 비용을 다시 내는 일을 막고, 파일이 바뀌면
+# 수정시각이 달라져 자동으로 새로 읽습니다.
+_CACHE = {}
+
+def load_config(path='config.yaml'):
     """
     config.yaml 파일에서 한국투자증권 API 키 및 계좌 정보를 로드합니다.
     강의 실습을 위해 프로젝트 루트에 config.yaml 파일이 준비되어 있어야 합니다.
+
+    💡 설정 키가 전부 평평한 문자열이라, PyYAML 의존성을 없애고 싶다면
+       같은 내용을 config.json 으로 옮기고 이 함수의 yaml.load 를
+       json.load 로 바꾸기만 하면 됩니다. (json 파싱이 훨씬 빠르기도 합니다.)
     """
-    if not os.path.exists('config.yaml'):
+    if not os.path.exists(path):
         print("❌ config.yaml 파일을 찾을 수 없습니다. (발급받은 API 키를 설정해주세요)")
         return None
-        
-    with open('config.yaml', 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
-        
+
+    key = (path, os.stat(path).st_mtime_ns)
+    if key in _CACHE:
+        return _CACHE[key]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        config = yaml.load(f, Loader=_Loader)
+
+    _CACHE.clear()  # 같은 경로의 옛 버전은 버립니다.
+    _CACHE[key] = config
     return config
 
 # 설정 로드 및 전역 변수 할당
@@ -36,3 +60,7 @@ else:
     ACNT_PRDT_CD = None
     TELEGRAM_TOKEN = None
     TELEGRAM_CHAT_ID = None
+
+# 모의투자 여부: URL_BASE 는 설정 로드 후 바뀌지 않으므로 문자열 검사를
+# 임포트 시점에 한 번만 하고, 각 챕터는 이 상수로 TR_ID를 확정합니다.
+IS_PAPER = URL_BASE is not None and "openapivts" in URL_BASE
@@ -0,0 +1,275 @@
+"""
+비동기(Async) 주문/조회 모듈 - 고빈도 호출 사용자를 위한 선택 기능
+
+💡 언제 필요한가요?
+   초 단위로 여러 건의 주문 전송과 미체결 폴링을 반복하는 봇이라면,
+   동기 requests 스택은 호출마다 스레드가 응답을 기다리며 멈춰 있습니다.
+   aiohttp 기반 비동기 호출은 여러 요청을 asyncio.gather 로 묶어
+   전체 소요 시간을 '가장 느린 한 건의 RTT'로 줄여 줍니다.
+
+📌 사용 전 준비 (선택 설치):
+   pip install aiohttp
+   pip install uvloop   # (선택) 리눅스에서 이벤트 루프 자체를 더 빠르게
+
+📌 사용 예:
+   async def main():
+       pending, price = await asyncio.gather(
+           get_pending_orders_async(token),
+           ...,
+       )
+   asyncio.run(main())
+
+   ※ 일반 강의 실습(챕터 1~8)은 기존 동기 함수만으로 충분합니다.
+"""
+
+import asyncio
+import datetime
+
+import aiohttp
+
+from config import URL_BASE, CANO, ACNT_PRDT_CD, IS_PAPER
+from kis_http import make_headers
+
+# 이벤트 루프 안에서 한 번만 생성해 재사용하는 공유 세션
+_ASYNC_SESSION = None
+
+
+async def _get_session():
+    """공유 aiohttp 세션을 (최초 1회) 생성하여 반환합니다."""
+    global _ASYNC_SESSION
+    if _ASYNC_SESSION is None or _ASYNC_SESSION.closed:
+        _ASYNC_SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=15),
+        )
+    return _ASYNC_SESSION
+
+
+async def close_session():
+    """프로그램 종료 전 공유 세션을 정리합니다."""
+    global _ASYNC_SESSION
+    if _ASYNC_SESSION is not None and not _ASYNC_SESSION.closed:
+        await _ASYNC_SESSION.close()
+    _ASYNC_SESSION = None
+
+
+async def hashkey_async(datas):
+    """chapter4_buy.hashkey 의 비동기 버전입니다."""
+    from config import APP_KEY, APP_SECRET
+
+    headers = {
+        "content-type": "application/json",
+        "appKey": APP_KEY,
+        "appsecret": APP_SECRET
+    }
+    session = await _get_session()
+    async with session.post(f"{URL_BASE}/uapi/hashkey", headers=headers, json=datas) as res:
+        if res.status == 200:
+            body = await res.json()
+            return body["HASH"]
+        print("❌ 해시키 발급에 실패했습니다.")
+        return ""
+
+
+async def send_buy_order_async(token, symbol, qty, price, market="NASD", order_type="00"):
+    """chapter4_buy.send_buy_order 와 동일한 로직의 비동기 버전입니다."""
+    return await _send_order_async(token, symbol, qty, price, market, order_type, is_buy=True)
+
+
+async def send_sell_order_async(token, symbol, qty, price, market="NASD", order_type="00"):
+    """chapter5_sell.send_sell_order 와 동일한 로직의 비동기 버전입니다."""
+    return await _send_order_async(token, symbol, qty, price, market, order_type, is_buy=False)
+
+
+async def _send_order_async(token, symbol, qty, price, market, order_type, is_buy):
+    try:
+        # 챕터 4·5와 동일한 정규화: KIS 스펙상 가격은 소수점 둘째 자리
+        # 문자열이어야 하므로 round() 대신 format(..., '.2f')를 씁니다.
+        qty_str = str(int(qty))
+        price_str = format(float(price), '.2f')
+    except (TypeError, ValueError):
+        print("❌ 수량 또는 가격 숫자로 변환하는 데 실패했습니다.")
+        return None
+
+    now = datetime.datetime.now()
+    is_daytime = 10 <= now.hour < 18
+
+    # 매수/매도 × 주간/정규장 TR_ID 매핑 (챕터 4·5와 동일)
+    if is_daytime:
+        tr_id = "TTTS6036U" if is_buy else "TTTS6037U"
+        url = f"{URL_BASE}/uapi/overseas-stock/v1/trading/daytime-order"
+        if order_type in ["34", "33", "32", "31"]:
+            order_type = "00"
+    else:
+        if is_buy:
+            tr_id = "TTTT1002U"
+        else:
+            # 챕터 5와 동일: 모의투자 정규장 매도는 전용 TR_ID 를 씁니다.
+            tr_id = "VTTS1001U" if IS_PAPER else "TTTT1006U"
+        url = f"{URL_BASE}/uapi/overseas-stock/v1/trading/order"
+
+    data = {
+        "CANO": CANO,
+        "ACNT_PRDT_CD": ACNT_PRDT_CD,
+        "OVRS_EXCG_CD": market,
+        "PDNO": symbol,
+        "ORD_DVSN": order_type,
+        "ORD_QTY": qty_str,
+        "OVRS_ORD_UNPR": price_str,
+        "ORD_SVR_DVSN_CD": "0"
+    }
+
+    hk = None
+    if tr_id in ("TTTT1002U", "TTTT1006U"):
+        hk = await hashkey_async(data)
+    headers = make_headers(token, tr_id, hashkey=hk)
+
+    session = await _get_session()
+    async with session.post(url, headers=headers, json=data) as res:
+        if res.status != 200:
+            print(f"❌ 주문 요청 실패 (HTTP 에러 통신): {res.status}")
+            return None
+        ret = await res.json()
+
+    if ret['rt_cd'] == '0':
+        return ret['output']['ODNO']
+    print(f"❌ 주문 요청 실패 (API 서버 응답): {ret['msg1']}")
+    return None
+
+
+async def get_pending_orders_async(token):
+    """chapter6_unfilled.get_pending_orders 의 비동기 버전 (주문 목록을 반환)."""
+    tr_id = "VTTS3018R" if IS_PAPER else "TTTS3018R"
+
+    headers = make_headers(token, tr_id)
+    params = {
+        "CANO": CANO,
+        "ACNT_PRDT_CD": ACNT_PRDT_CD,
+        "OVRS_EXCG_CD": "NASD",
+        "SORT_SQN": "DS",
+        "CTX_AREA_FK200": "",
+        "CTX_AREA_NK200": ""
+    }
+
+    session = await _get_session()
+    async with session.get(
+        f"{URL_BASE}/uapi/overseas-stock/v1/trading/inquire-nccs",
+        headers=headers,
+        params=params,
+    ) as res:
+        if res.status != 200:
+            print(f"❌ HTTP 통신 오류: 응답코드 {res.status}")
+            return []
+        data = await res.json()
+
+    if data['rt_cd'] != '0':
+        print(f"❌ KIS API 비즈니스 로직 에러: {data['msg1']}")
+        return []
+    return data.get('output', [])
+
+
+async def _fetch_page(session, url, headers, params):
+    """체결 내역 한 페이지를 받아 (본문, tr_cont 헤더)를 반환합니다."""
+    async with session.get(url, headers=headers, params=params) as res:
+        if res.status != 200:
+            print(f"❌ HTTP 통신 에러: {res.status}")
+            print(await res.text())
+            return None, None
+        return await res.json(), res.headers.get('tr_cont', 'D')
+
+
+async def iter_filled_orders_async(token, start_date=None, end_date=None, max_pages=10):
+    """
+    chapter7_filled.get_filled_orders 의 비동기 제너레이터 버전입니다.
+    페이지 단위로 주문 리스트를 yield 합니다.
+
+    KIS 연속조회는 페이지 N의 ctx_area_nk200 이 있어야 N+1을 요청할 수 있어
+    페이지 자체를 병렬로 받을 수는 없습니다. 대신 페이지 N을 파싱해 연속조회
+    키를 얻자마자 N+1 요청을 asyncio.create_task 로 먼저 띄워 두고 N의 결과를
+    yield 하므로, 호출자가 페이지 N을 처리(출력/집계)하는 동안 다음 페이지가
+    네트워크를 타고 들어옵니다. 여러 페이지 조회 시 체감 시간이 RTT 수준까지
+    줄어듭니다.
+    """
+    tr_id = "VTTS3035R" if IS_PAPER else "TTTS3035R"
+
+    today = datetime.datetime.now().strftime("%Y%m%d")
+    if start_date is None:
+        start_date = today
+    if end_date is None:
+        end_date = today
+
+    headers = make_headers(token, tr_id)
+    params = {
+        "CANO": CANO,
+        "ACNT_PRDT_CD": ACNT_PRDT_CD,
+        "PDNO": "%",
+        "ORD_STRT_DT": start_date,
+        "ORD_END_DT": end_date,
+        "SLL_BUY_DVSN": "00",
+        "CCLD_NCCS_DVSN": "00",
+        "OVRS_EXCG_CD": "%",
+        "SORT_SQN": "DS",
+        "ORD_DT": "",
+        "ORD_GNO_BRNO": "",
+        "ODNO": "",
+        "CTX_AREA_FK200": "",
+        "CTX_AREA_NK200": ""
+    }
+    url = f"{URL_BASE}/uapi/overseas-stock/v1/trading/inquire-ccnl"
+
+    session = await _get_session()
+    # 요청마다 headers/params 사본을 넘겨, 다음 페이지 준비를 위한 수정이
+    # 이미 전송 중인 요청에 영향을 주지 않게 합니다.
+    task = asyncio.create_task(_fetch_page(session, url, dict(headers), dict(params)))
+
+    try:
+        for page_no in range(max_pages):
+            result, tr_cont = await task
+            task = None  # 소비 완료 — finally 의 취소 대상에서 제외합니다.
+
+            if result is None:
+                return
+            if result.get('rt_cd') != '0':
+                print(f"❌ API 내에서 처리 오류 발생: {result.get('msg1', '알 수 없는 에러')}")
+                return
+
+            ctx_nk200 = result.get('ctx_area_nk200', '').strip()
+            ctx_fk200 = result.get('ctx_area_fk200', '').strip()
+            more = tr_cont in ('M', 'F') and bool(ctx_nk200)
+
+            if more and page_no + 1 < max_pages:
+                # ⭐ 핵심: 다음 페이지를 '먼저' 쏘아 두고 현재 페이지를 yield 합니다.
+                # (max_pages 마지막 회차에는 소비할 이터레이션이 없으므로
+                # 선요청을 띄우지 않습니다 — 띄우면 고아 태스크가 됩니다)
+                params["CTX_AREA_NK200"] = ctx_nk200
+                params["CTX_AREA_FK200"] = ctx_fk200
+                headers["tr_cont"] = "N"  # 2페이지부터는 연속조회(N) 표시
+                task = asyncio.create_task(_fetch_page(session, url, dict(headers), dict(params)))
+
+            yield result.get('output', [])
+
+            if not more:
+                return
+    finally:
+        # 소비자가 중간에 break 하거나 위에서 조기 return 하면 전송 중인
+        # 선요청이 남습니다. 취소하고 완료까지 기다려 'Task was destroyed
+        # but it is pending' 경고와 고아 요청을 막습니다.
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+if __name__ == "__main__":
+    # 예시: 미체결 폴링 10회를 한 번의 gather 로 묶어 전송
+    async def _demo(token):
+        results = await asyncio.gather(*[get_pending_orders_async(token) for _ in range(10)])
+        print(f"동시 폴링 {len(results)}회 완료 (각 {len(results[0])}건)")
+        await close_session()
+
+    from chapter1_token import get_access_token
+    token = get_access_token()
+    if token:
+        asyncio.run(_demo(token))
@@ -0,0 +1,215 @@
+"""
+공통 HTTP 통신 모듈 (Shared Session)
+
+💡 왜 필요한가요?
+   각 챕터에서 requests.get / requests.post 를 직접 호출하면 호출할 때마다
+   새로운 TCP + TLS 연결을 맺게 됩니다. KIS API는 전부 같은 서버
+   (openapi.koreainvestment.com)로 나가기 때문에, 하나의 Session을 공유하면
+   Keep-Alive로 연결을 재사용하여 TLS 핸드셰이크 비용(수백 ms)을 아낄 수 있습니다.
+
+📌 핵심 포인트:
+   1. 토큰 발급 → 시세 조회 → 잔고 조회 → 주문 전송까지 하나의 TLS 연결을 유지합니다.
+   2. 일시적인 서버 오류(429, 5xx)는 Retry 설정으로 자동 재시도합니다.
+   3. 모든 챕터에서 `from kis_http import _SESSION` 으로 가져다 쓰면 됩니다.
+   4. 공통 인증 헤더는 `make_headers(token, tr_id)` 한 줄로 만들 수 있습니다.
+      (호출할 기능에 따라 바뀌는 것은 tr_id 뿐이라는 점을 기억하세요!)
+"""
+
+import os
+import ssl
+import threading
+
+import requests
+import requests.models
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import APP_KEY, APP_SECRET, URL_BASE
+
+# orjson이 설치되어 있으면 requests 내부의 JSON 직렬화/파싱을 orjson으로
+# 교체합니다. (stdlib json 대비 3~5배 빠르고 bytes를 바로 만들어 냅니다.)
+# 설치되어 있지 않아도 stdlib json으로 동일하게 동작합니다.
+try:
+    import orjson as _orjson
+
+    class _OrjsonShim:
+        """requests가 기대하는 dumps/loads 시그니처에 orjson을 맞춰주는 어댑터"""
+        JSONDecodeError = _orjson.JSONDecodeError
+
+        @staticmethod
+        def dumps(obj, **kwargs):
+            return _orjson.dumps(obj)
+
+        @staticmethod
+        def loads(data, **kwargs):
+            return _orjson.loads(data)
+
+    requests.models.complexjson = _OrjsonShim
+except ImportError:
+    _orjson = None
+
+# SSL 컨텍스트를 프로세스당 한 번만 만들어 모든 연결이 공유합니다.
+# 기본 동작은 새 연결(풀 확장 포함)마다 certifi의 CA 번들(PEM)을 다시 읽고
+# 파싱하는 것이라, 병렬 조회로 연결이 늘어날 때 불필요한 비용이 듭니다.
+try:
+    import certifi
+    _SSL_CTX = ssl.create_default_context(cafile=certifi.where())
+except ImportError:
+    _SSL_CTX = ssl.create_default_context()
+
+
+class _KISAdapter(HTTPAdapter):
+    """연결 풀에 고정된 SSLContext를 주입하는 HTTPAdapter"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = _SSL_CTX
+        return super().init_poolmanager(*args, **kwargs)
+
+
+# 전 챕터가 공유하는 단일 세션 (연결 풀 + 자동 재시도)
+#
+# 환경변수 KIS_HTTP2=1 을 주면 httpx 기반 HTTP/2 클라이언트를 사용합니다.
+# (선택 설치: pip install "httpx[http2]") HTTP/2는 하나의 TLS 연결 위에
+# 여러 요청을 다중화(multiplexing)하므로, 시세 병렬 조회처럼 동시에 여러
+# 호출이 나갈 때 연결 수만큼 반복되던 TLS 핸드셰이크가 한 번으로 줄어듭니다.
+#
+# ⚠️ httpx 가 '설치되어 있다'는 이유만으로 전송 계층을 바꾸지는 않습니다.
+# httpx 에는 urllib3 의 상태코드 기반 자동 재시도(429/5xx)에 해당하는
+# 기능이 없어서, 무관한 패키지 설치 여부에 따라 챕터 1~6의 복원력이
+# 조용히 약해지기 때문입니다. 옵트인 시에도 연결 수준 재시도(retries=3)는
+# 전송 계층에 걸어 두지만, 상태코드 재시도는 없다는 점을 감안하세요.
+# (챕터 7은 자체 백오프 루프가 429/5xx 를 직접 처리하므로 영향이 없습니다)
+#
+# httpx의 get/post 기본 인터페이스는 requests와 거의 같지만 전부는 아닙니다.
+# requests 전용 기능(stream=/res.raw, prepare_request 등)을 쓰는 챕터는
+# hasattr(_SESSION, 'prepare_request') 가드로 분기해 양쪽에서 동작합니다.
+_SESSION = None
+if os.environ.get("KIS_HTTP2", "").strip().lower() in ("1", "true", "yes", "y"):
+    try:
+        import httpx
+
+        _SESSION = httpx.Client(
+            transport=httpx.HTTPTransport(
+                http2=True,
+                verify=_SSL_CTX,
+                limits=httpx.Limits(max_keepalive_connections=8, max_connections=16),
+                retries=3,  # 연결 실패만 재시도합니다 (상태코드 재시도 아님)
+            ),
+            timeout=httpx.Timeout(15.0),
+        )
+    except ImportError:
+        pass  # httpx 미설치 시 아래의 requests 세션으로 내려갑니다.
+
+if _SESSION is None:
+    _SESSION = requests.Session()
+    _SESSION.mount("https://", _KISAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            # 재시도 소진 시 RetryError를 던지는 대신 마지막 응답을 그대로
+            # 돌려줍니다. 챕터 7의 Retry-After 백오프 루프와 AIMD 기록이
+            # 429/5xx 상태 코드를 직접 관찰해야 하기 때문입니다.
+            raise_on_status=False,
+        ),
+    ))
+    # 챕터 7의 체결 내역 연속조회는 자체 백오프 루프 + 토큰 버킷 + AIMD 가
+    # 429/5xx 정책을 직접 소유합니다. 이 엔드포인트까지 위의 상태코드 기반
+    # 재시도를 태우면 버킷 토큰 1개당 최대 4번의 실요청이 나가는 재시도
+    # 증폭이 생기므로, 여기만은 연결 수준 재시도만 남긴 어댑터를 따로
+    # 마운트합니다. (requests 는 가장 긴 URL 접두사의 어댑터를 고릅니다)
+    _SESSION.mount((URL_BASE or "") + "/uapi/overseas-stock/v1/trading/inquire-ccnl", _KISAdapter(
+        pool_connections=1,
+        pool_maxsize=4,
+        max_retries=Retry(
+            total=None,
+            connect=3,
+            read=0,
+            status=0,
+            other=0,
+            backoff_factor=0.3,
+            raise_on_status=False,
+        ),
+    ))
+
+# requests는 기본으로 keep-alive를 쓰지만, 연결 재사용이 이 모듈의 핵심
+# 전제라는 점을 명시하기 위해 헤더로도 박아 둡니다.
+_SESSION.headers["Connection"] = "keep-alive"
+
+
+def _warm_up():
+    """백그라운드에서 KIS 서버와 TLS 핸드셰이크를 미리 끝내 둡니다.
+
+    첫 API 호출이 수백 ms짜리 핸드셰이크를 기다리지 않도록, 모듈 임포트
+    시점에 데몬 스레드로 연결 풀을 채워 둡니다. 실패해도 무해합니다
+    (첫 실제 호출이 평소처럼 연결을 새로 맺을 뿐입니다).
+    """
+    try:
+        _SESSION.get(URL_BASE, timeout=5)
+    except Exception:
+        pass
+
+
+if URL_BASE:
+    threading.Thread(target=_warm_up, daemon=True).start()
+
+# KIS 엔드포인트 URL 모음: URL_BASE는 설정 로드 후 바뀌지 않으므로
+# 호출마다 f-string으로 조립하지 않고 임포트 시점에 한 번만 만들어 둡니다.
+_BASE = URL_BASE or ""
+TOKEN_URL = _BASE + "/oauth2/tokenP"
+HASHKEY_URL = _BASE + "/uapi/hashkey"
+PRICE_URL = _BASE + "/uapi/overseas-price/v1/quotations/price"
+PRICE_DETAIL_URL = _BASE + "/uapi/overseas-price/v1/quotations/price-detail"
+BALANCE_URL = _BASE + "/uapi/overseas-stock/v1/trading/inquire-balance"
+ORDER_URL = _BASE + "/uapi/overseas-stock/v1/trading/order"
+DAYTIME_ORDER_URL = _BASE + "/uapi/overseas-stock/v1/trading/daytime-order"
+NCCS_URL = _BASE + "/uapi/overseas-stock/v1/trading/inquire-nccs"
+
+# 매 호출마다 똑같이 들어가는 고정 필드들 (앱키/시크릿/고객유형)
+_BASE_HEADERS = {
+    "Content-Type": "application/json",
+    "appKey": APP_KEY,
+    "appsecret": APP_SECRET,
+    "custtype": "P",  # 개인 고객 (B: 법인)
+}
+
+# "Bearer xxx" 문자열은 토큰이 바뀔 때만 새로 만들면 됩니다.
+# (token, value) 쌍을 튜플 하나로 발행해야 병렬 조회 워커가 token 은
+# 새것, value 는 옛것인 어긋난 상태를 볼 수 없습니다. (참조 교체는 원자적)
+_BEARER_CACHE = (None, None)
+
+
+def parse(res):
+    """
+    응답 본문을 JSON으로 파싱합니다.
+
+    res.json()은 내부적으로 res.text(문자 인코딩 감지 + 디코딩)를 거치지만,
+    KIS 응답은 항상 UTF-8 JSON이므로 orjson이 있으면 res.content(bytes)를
+    바로 파싱하여 디코딩 단계를 건너뜁니다.
+    """
+    if _orjson is not None:
+        return _orjson.loads(res.content)
+    return res.json()
+
+
+def make_headers(token, tr_id, hashkey=None):
+    """
+    KIS API 공통 인증 헤더를 생성합니다.
+
+    고정 필드(_BASE_HEADERS)는 복사만 하고, 호출마다 달라지는
+    authorization / tr_id / hashkey 만 덧붙입니다.
+    """
+    global _BEARER_CACHE
+    cached_token, bearer = _BEARER_CACHE
+    if cached_token != token:
+        bearer = f"Bearer {token}"
+        _BEARER_CACHE = (token, bearer)
+
+    headers = _BASE_HEADERS.copy()
+    headers["authorization"] = bearer
+    headers["tr_id"] = tr_id
+    if hashkey:
+        headers["hashkey"] = hashkey
+    return headers
@@ -0,0 +1,107 @@
+"""
+클라이언트 측 호출 속도 제한 모듈 (Rate Limiting)
+
+💡 왜 필요한가요?
+   KIS OpenAPI는 계좌 단위로 초당 약 20건의 호출 제한이 있습니다.
+   챕터 7(체결 조회)과 챕터 8(정정/취소)을 연달아 돌리면 각자 아무
+   조율 없이 요청을 쏘므로 한도를 넘겨 429로 조회가 중간에 끊길 수
+   있습니다. 프로세스 전체가 하나의 토큰 버킷을 공유하면 어느 모듈이
+   호출하든 합산 속도가 한도 아래로 유지됩니다.
+
+📌 사용법:
+   from ratelimit import _BUCKET
+   _BUCKET.acquire()          # 매 HTTP 호출 직전에 한 줄
+   res = _SESSION.get(...)
+"""
+
+import contextlib
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    모노토닉 시계 기반 토큰 버킷.
+
+    버킷에는 최대 capacity 개의 토큰이 담기고 초당 rate 개씩 다시 채워집니다.
+    acquire()는 토큰이 있으면 즉시 통과하고, 없으면 채워질 때까지의 시간만
+    정확히 계산해 잠듭니다. 즉 버스트(최대 capacity건)는 지연 없이 나가고,
+    지속 호출만 rate 이하로 눌러 줍니다. threading.Lock 으로 보호되어
+    병렬 조회(스레드 풀)에서도 안전합니다.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """토큰을 확보할 때까지 (필요 시) 대기한 뒤 반환합니다."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                # 마지막 확인 이후 흐른 시간만큼 토큰을 다시 채웁니다.
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                # 부족한 만큼이 채워지는 데 걸리는 시간만 잠듭니다.
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AIMDController:
+    """
+    TCP 혼잡 제어와 같은 AIMD(가산 증가 / 승산 감소) 동시성 제어기.
+
+    토큰 버킷이 '초당 몇 건'을 다룬다면, 이 제어기는 '동시에 몇 건'을
+    다룹니다. 응답이 빠르고 정상이면 허용 동시성 c_t 를 alpha 씩 더해
+    늘리고, 429/5xx 나 지연 급증이 보이면 beta 를 곱해 절반으로 줄입니다.
+    수동으로 워커 수를 튜닝하지 않아도 계좌별 안전 한도에 스스로
+    수렴합니다. 직렬 호출에서는 슬롯이 항상 비어 있어 비용이 없습니다.
+    """
+
+    def __init__(self, alpha=0.5, beta=0.5, c_min=1, c_max=8, latency_target=1.0):
+        self.alpha = alpha
+        self.beta = beta
+        self.c_min = c_min
+        self.c_max = c_max
+        self.latency_target = latency_target  # 이 지연(초)을 넘으면 혼잡으로 간주
+        self.c_t = float(c_min)
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    @contextlib.contextmanager
+    def slot(self):
+        """허용 동시성에 빈 자리가 날 때까지 기다렸다가 슬롯을 점유합니다."""
+        with self._cond:
+            while self._in_flight >= int(self.c_t):
+                self._cond.wait()
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify()
+
+    def record(self, latency, status_code):
+        """응답 1건의 지연/상태를 반영해 허용 동시성을 조정합니다."""
+        with self._cond:
+            if status_code in (429, 502, 503) or latency > self.latency_target:
+                self.c_t = max(self.c_min, self.c_t * self.beta)   # 승산 감소
+            else:
+                self.c_t = min(self.c_max, self.c_t + self.alpha)  # 가산 증가
+            self._cond.notify()
+
+
+# 프로세스 전역 공유 버킷: 서버 한도(약 20/s)보다 살짝 여유를 둔 18/s.
+# 모든 챕터가 이 인스턴스 하나를 가져다 쓰면 합산 호출 속도가 보장됩니다.
+_BUCKET = TokenBucket(rate=18, capacity=20)
+
+# 전역 AIMD 제어기: 병렬로 API 를 때리는 코드가 슬롯을 나눠 씁니다.
+_AIMD = AIMDController()